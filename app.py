@@ -3,11 +3,13 @@ LeerVibeCoding.nl - AI-Powered Vibe Coding Platform
 Dynamische opdrachten gegenereerd door OpenAI met progressieve moeilijkheid
 """
 
-from flask import Flask, render_template, request, jsonify, session, send_from_directory, redirect
+from flask import Flask, render_template, request, jsonify, session, send_from_directory, redirect, Response
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import timedelta
 import requests
 import secrets
 import json
+import time
 import os
 
 app = Flask(__name__, static_folder='static')
@@ -26,6 +28,13 @@ DIFFICULTY_LEVELS = [
     {"level": 8, "name": "AI Meester", "focus": "Complete AI-applicaties", "ai_integration": True, "min_xp": 1500},
 ]
 
+# Batch assignment generation (klassikaal gebruik)
+MAX_BATCH_ASSIGNMENTS = 30
+ASSIGNMENT_BATCH_CHUNK_SIZE = 5  # opdrachten per OpenAI call
+ASSIGNMENT_BATCH_WORKERS = 3  # max parallelle OpenAI calls per batch
+ASSIGNMENT_BATCH_RETRIES = 3  # extra calls om dubbele of mislukte opdrachten aan te vullen
+ASSIGNMENT_BATCH_TIMEOUT = 240  # seconden; blijft onder de gunicorn --timeout in render.yaml
+
 def call_openai(api_key, messages, model="gpt-4o-mini", max_tokens=4000):
     """Call OpenAI API"""
     try:
@@ -61,8 +70,8 @@ def call_openai(api_key, messages, model="gpt-4o-mini", max_tokens=4000):
         print(f"OpenAI exception: {e}")
         return None
 
-def generate_assignment(api_key, level, completed_assignments):
-    """Generate a new assignment based on current level"""
+def build_assignment_prompts(level, completed_assignments):
+    """Build system + level prompt for assignment generation"""
     level_info = DIFFICULTY_LEVELS[min(level - 1, len(DIFFICULTY_LEVELS) - 1)]
     
     # Build context about what user has already done
@@ -244,6 +253,20 @@ NIVEAU: {level_info['level']} - {level_info['name']} (Opdracht #{assignment_numb
 Genereer een passende opdracht voor dit niveau.
 Focus: {level_info['focus']}"""
 
+    return system_prompt, level_prompt, level_info
+
+def finalize_assignment(assignment, level_info):
+    """Add level metadata to a parsed assignment"""
+    assignment['level'] = level_info['level']
+    assignment['level_name'] = level_info['name']
+    assignment['ai_integration'] = level_info['ai_integration']
+    assignment['base_xp'] = 20 + (level_info['level'] * 15)  # XP scales with level
+    return assignment
+
+def generate_assignment(api_key, level, completed_assignments):
+    """Generate a new assignment based on current level"""
+    system_prompt, level_prompt, level_info = build_assignment_prompts(level, completed_assignments)
+
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": level_prompt}
@@ -257,17 +280,117 @@ Focus: {level_info['focus']}"""
             json_start = response.find('{')
             json_end = response.rfind('}') + 1
             if json_start != -1 and json_end > json_start:
-                assignment = json.loads(response[json_start:json_end])
-                assignment['level'] = level_info['level']
-                assignment['level_name'] = level_info['name']
-                assignment['ai_integration'] = level_info['ai_integration']
-                assignment['base_xp'] = 20 + (level_info['level'] * 15)  # XP scales with level
-                return assignment
+                return finalize_assignment(json.loads(response[json_start:json_end]), level_info)
         except json.JSONDecodeError as e:
             print(f"JSON parse error: {e}")
     
     return None
 
+def is_valid_batch_assignment(item):
+    """Check that a batch item has the fields the frontend relies on"""
+    if not isinstance(item, dict):
+        return False
+    for field in ('title', 'task', 'scenario', 'client_name'):
+        if not isinstance(item.get(field), str) or not item[field].strip():
+            return False
+    for field in ('requirements', 'success_criteria', 'hints'):
+        value = item.get(field)
+        if not isinstance(value, list) or not value or not all(isinstance(v, str) for v in value):
+            return False
+    return True
+
+def generate_assignment_chunk(api_key, level, completed_assignments, count, exclude_titles=None):
+    """Generate `count` distinct assignments in one OpenAI call (JSON array output)"""
+    system_prompt, level_prompt, level_info = build_assignment_prompts(level, completed_assignments)
+
+    exclude_context = ""
+    if exclude_titles:
+        exclude_context = f"\nDeze opdrachten zijn al gemaakt, verzin iets COMPLEET ANDERS: {', '.join(exclude_titles)}."
+
+    batch_prompt = f"""{level_prompt}
+
+KLASSIKALE REEKS:{exclude_context}
+Verzin {count} VERSCHILLENDE opdrachten voor dit niveau - elke opdracht een andere klant, ander thema en andere humor.
+OUTPUT ALLEEN EEN VALID JSON ARRAY met {count} objecten, elk in precies het formaat hierboven:
+[{{...}}, {{...}}]"""
+
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": batch_prompt}
+    ]
+
+    response = call_openai(api_key, messages, max_tokens=min(16000, 1200 * count))
+
+    assignments = []
+    if response:
+        try:
+            # Extract JSON array
+            json_start = response.find('[')
+            json_end = response.rfind(']') + 1
+            if json_start != -1 and json_end > json_start:
+                for item in json.loads(response[json_start:json_end]):
+                    # Skip malformed items instead of passing them on to the classroom
+                    if is_valid_batch_assignment(item):
+                        assignments.append(finalize_assignment(item, level_info))
+        except json.JSONDecodeError as e:
+            print(f"JSON parse error: {e}")
+
+    return assignments
+
+def generate_assignments_batch(api_key, level, completed_assignments, count):
+    """Generate `count` assignments, yielding each one as soon as its chunk is ready.
+
+    The work is split into chunks of ASSIGNMENT_BATCH_CHUNK_SIZE assignments per
+    OpenAI call, so the system prompt is sent once per chunk instead of once per
+    assignment, and at most ASSIGNMENT_BATCH_WORKERS chunks run in parallel.
+    Assignments lost to duplicates or unparseable output are refilled with
+    follow-up chunks, up to ASSIGNMENT_BATCH_RETRIES extra chunks. The batch
+    stops after ASSIGNMENT_BATCH_TIMEOUT seconds with whatever is ready.
+    """
+    deadline = time.monotonic() + ASSIGNMENT_BATCH_TIMEOUT
+    max_chunks = -(-count // ASSIGNMENT_BATCH_CHUNK_SIZE) + ASSIGNMENT_BATCH_RETRIES
+    chunks_started = 0
+    seen_titles = {}
+    yielded = 0
+    executor = ThreadPoolExecutor(max_workers=ASSIGNMENT_BATCH_WORKERS)
+    try:
+        # Only keep as many chunks in flight as there are workers, so nothing
+        # sits queued that a worker could pick up after the client is gone
+        pending = {}
+        while yielded < count:
+            in_flight = sum(pending.values())
+            while count - yielded - in_flight > 0 and len(pending) < ASSIGNMENT_BATCH_WORKERS and chunks_started < max_chunks:
+                size = min(ASSIGNMENT_BATCH_CHUNK_SIZE, count - yielded - in_flight)
+                future = executor.submit(generate_assignment_chunk, api_key, level, completed_assignments, size, list(seen_titles.values()))
+                pending[future] = size
+                in_flight += size
+                chunks_started += 1
+            remaining = deadline - time.monotonic()
+            if not pending or remaining <= 0:
+                break
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                del pending[future]
+                try:
+                    assignments = future.result()
+                except Exception as e:
+                    print(f"Batch chunk error: {e}")
+                    continue
+                for assignment in assignments:
+                    # Parallel chunks can't see each other, so drop duplicate titles
+                    key = str(assignment.get('title', '')).strip().lower()
+                    if key in seen_titles:
+                        continue
+                    seen_titles[key] = assignment['title']
+                    yielded += 1
+                    yield assignment
+                    if yielded >= count:
+                        return
+    finally:
+        # Also runs when the client disconnects (GeneratorExit): don't wait for
+        # running chunks, so the response isn't held open for unused output
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def generate_code(api_key, user_prompt, assignment):
     """Generate working code from user's prompt"""
     
@@ -595,6 +718,48 @@ def api_generate_assignment():
         print(f"Error in api_generate_assignment: {e}")
         return jsonify({"success": False, "error": f"Server error: {str(e)}"})
 
+@app.route('/api/generate-assignments-batch', methods=['POST'])
+def api_generate_assignments_batch():
+    """Generate multiple assignments for a level, streamed as NDJSON"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"success": False, "error": "Ongeldige JSON"}), 400
+
+    api_key = data.get('api_key')
+    completed = data.get('completed', [])
+
+    if not api_key:
+        return jsonify({"success": False, "error": "API key vereist"}), 400
+
+    try:
+        level = int(data.get('level', 1))
+        count = int(data.get('count', 1))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Niveau en aantal moeten getallen zijn"}), 400
+
+    # Clamp so build_assignment_prompts never indexes DIFFICULTY_LEVELS out of range
+    level = max(1, min(level, len(DIFFICULTY_LEVELS)))
+
+    if count < 1 or count > MAX_BATCH_ASSIGNMENTS:
+        return jsonify({"success": False, "error": f"Aantal opdrachten moet tussen 1 en {MAX_BATCH_ASSIGNMENTS} liggen"}), 400
+
+    print(f"Generating {count} assignments for level {level}")
+
+    def stream():
+        generated = 0
+        try:
+            for assignment in generate_assignments_batch(api_key, level, completed, count):
+                generated += 1
+                yield json.dumps({"success": True, "assignment": assignment}) + "\n"
+        except Exception as e:
+            print(f"Error in api_generate_assignments_batch: {e}")
+        print(f"Batch generated: {generated}/{count} assignments")
+        if generated == 0:
+            yield json.dumps({"success": False, "error": "Kon geen opdrachten genereren. Controleer je API key en credits."}) + "\n"
+        yield json.dumps({"done": True, "count": generated, "requested": count}) + "\n"
+
+    return Response(stream(), mimetype='application/x-ndjson')
+
 @app.route('/api/submit-prompt', methods=['POST'])
 def api_submit_prompt():
     """Submit prompt and get code + evaluation"""